@@ -3,14 +3,20 @@ Agent module - Agent-related functionality
 Contains agent definitions, tool collections and utilities
 """
 
-from agent.agent import get_agent
-from agent.tools import scrape_url, generate_requirements, generate_test_code, show_status, search_experience
+from agent.agent import get_agent, init_checkpointer, close_checkpointer
+from agent.state import step_messages
+from agent.tools import scrape_url, generate_requirements, generate_test_code, show_status, search_experience, search_artifacts_many, fetch_full_tool_output
 
 __all__ = [
     'get_agent',
+    'init_checkpointer',
+    'close_checkpointer',
+    'step_messages',
     'scrape_url',
     'generate_requirements',
     'generate_test_code',
     'show_status',
-    'search_experience'
+    'search_experience',
+    'search_artifacts_many',
+    'fetch_full_tool_output'
 ]
@@ -3,24 +3,108 @@ LangGraph-based ReAct agent - 2025 best practices
 Uses create_react_agent for simplified implementation, supports RAG retrieval and multi-turn conversation memory
 """
 
+import os
+import threading
+from typing import Dict, Optional
+
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.memory import InMemorySaver
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import SystemMessage
 from config import MODEL_CONFIG
-from agent.tools import scrape_url, generate_requirements, generate_test_code, show_status, search_experience, search_artifacts
+from agent.tools import (
+    scrape_url, generate_requirements, generate_test_code, show_status, search_experience, search_artifacts,
+    search_artifacts_many, fetch_full_tool_output
+)
 from agent.prompt import AGENT_SYSTEM_PROMPT
-from agent.state import AgentState
+from agent.state import AgentState, truncate_tool_outputs
 
+# Shared model client (keeps the underlying HTTP connection pool alive) and compiled agents,
+# keyed by id(checkpointer). Each entry keeps its checkpointer alive so the id cannot be reused.
+_MODEL: Optional[ChatOpenAI] = None
+_DEFAULT_CHECKPOINTER: Optional[InMemorySaver] = None
+_PERSISTENT_CHECKPOINTER = None
+_AGENT_CACHE: Dict[int, tuple] = {}
+_AGENT_LOCK = threading.Lock()
 
-def get_agent(checkpointer=None):
-    """Get agent instance - supports RAG and multi-turn conversation memory"""
-    model = ChatOpenAI(**MODEL_CONFIG)
-    checkpointer = checkpointer or InMemorySaver()
-
-    return create_react_agent(
-        model=model,
-        tools=[scrape_url, generate_requirements, generate_test_code, show_status, search_experience, search_artifacts],
-        prompt=AGENT_SYSTEM_PROMPT,
-        checkpointer=checkpointer,
-        state_schema=AgentState
+# Built once so every request starts with a byte-identical prefix (system prompt, then tools),
+# which lets OpenAI's automatic prompt caching reuse it across calls and conversations
+_SYSTEM_MESSAGE = SystemMessage(content=AGENT_SYSTEM_PROMPT)
+_TOOLS = [
+    scrape_url, generate_requirements, generate_test_code, show_status, search_experience, search_artifacts,
+    search_artifacts_many, fetch_full_tool_output
+]
+
+
+def _get_model() -> ChatOpenAI:
+    """Get the shared chat model client"""
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = ChatOpenAI(**MODEL_CONFIG)
+    return _MODEL
+
+
+async def init_checkpointer():
+    """Initialize the shared persistent checkpointer when CHECKPOINT_DB is set
+
+    Conversation state is stored in Postgres instead of Python dicts, so it survives restarts.
+    Returns None (in-memory checkpoints) when CHECKPOINT_DB is not configured.
+    """
+    global _PERSISTENT_CHECKPOINTER
+    conn_str = os.getenv("CHECKPOINT_DB")
+    if _PERSISTENT_CHECKPOINTER is not None or not conn_str:
+        return _PERSISTENT_CHECKPOINTER
+
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+    pool = AsyncConnectionPool(
+        conn_str, max_size=10, open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
     )
+    await pool.open()
+    checkpointer = AsyncPostgresSaver(pool)
+    await checkpointer.setup()
+    _PERSISTENT_CHECKPOINTER = checkpointer
+    print("💾 Persistent checkpointer enabled")
+    return checkpointer
+
+
+async def close_checkpointer():
+    """Close the persistent checkpointer connection pool"""
+    global _PERSISTENT_CHECKPOINTER
+    if _PERSISTENT_CHECKPOINTER is not None:
+        await _PERSISTENT_CHECKPOINTER.conn.close()
+        _PERSISTENT_CHECKPOINTER = None
+
+
+def get_agent(checkpointer=None):
+    """Get agent instance - supports RAG and multi-turn conversation memory
+
+    Agents are cached per checkpointer, so repeated calls return the already compiled graph.
+    Without an explicit checkpointer the persistent one is used if initialized, else a shared InMemorySaver.
+    """
+    global _DEFAULT_CHECKPOINTER
+    with _AGENT_LOCK:
+        if checkpointer is None:
+            checkpointer = _PERSISTENT_CHECKPOINTER
+        if checkpointer is None:
+            _DEFAULT_CHECKPOINTER = _DEFAULT_CHECKPOINTER or InMemorySaver()
+            checkpointer = _DEFAULT_CHECKPOINTER
+
+        cached = _AGENT_CACHE.get(id(checkpointer))
+        if cached is not None:
+            return cached[1]
+
+        agent = create_react_agent(
+            model=_get_model(),
+            tools=_TOOLS,
+            prompt=_SYSTEM_MESSAGE,
+            checkpointer=checkpointer,
+            state_schema=AgentState,
+            pre_model_hook=truncate_tool_outputs,  # Stores and truncates oversized tool results before each model call
+            version="v2"  # Fan out each tool call with Send so independent calls run concurrently
+        )
+        _AGENT_CACHE[id(checkpointer)] = (checkpointer, agent)
+        return agent
@@ -0,0 +1,94 @@
+"""
+Semantic cache module
+In-process cache of search results keyed by query embedding, so near-identical queries skip the database round trip
+"""
+
+import time
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """Embedding-keyed result cache with cosine-similarity lookup and TTL eviction
+
+    Embeddings are stored as int8 codes with a per-row scale, a quarter of the float32 footprint.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600, max_entries: int = 256):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._matrix: Optional[np.ndarray] = None  # One int8-quantized normalized embedding per row
+        self._scales: Optional[np.ndarray] = None  # Per-row quantization scale (127 / max_abs)
+        self._results: List[Any] = []
+        self._timestamps: List[float] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    @staticmethod
+    def _quantize(vec: np.ndarray):
+        """Scalar-quantize a vector to int8, returning the codes and their scale"""
+        max_abs = float(np.max(np.abs(vec))) or 1.0
+        scale = 127.0 / max_abs
+        return np.round(vec * scale).astype(np.int8), scale
+
+    def _evict_expired(self):
+        """Drop entries older than the TTL (entries are stored oldest first)"""
+        cutoff = time.monotonic() - self.ttl
+        expired = 0
+        while expired < len(self._timestamps) and self._timestamps[expired] < cutoff:
+            expired += 1
+        if expired:
+            remaining = expired < len(self._timestamps)
+            self._matrix = self._matrix[expired:] if remaining else None
+            self._scales = self._scales[expired:] if remaining else None
+            del self._results[:expired]
+            del self._timestamps[:expired]
+
+    def get(self, vector) -> Optional[Any]:
+        """Return the cached result for the most similar query, if similar enough"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._evict_expired()
+            if self._matrix is None:
+                return None
+            # int8 codes are upcast during the matmul; dividing by the row scale dequantizes
+            similarities = (self._matrix @ query) / self._scales
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                return self._results[best]
+        return None
+
+    def put(self, vector, result: Any):
+        """Store a result under its query embedding"""
+        codes, scale = self._quantize(self._normalize(vector))
+        with self._lock:
+            self._evict_expired()
+            if len(self._results) >= self.max_entries:
+                self._matrix = self._matrix[1:]
+                self._scales = self._scales[1:]
+                del self._results[0]
+                del self._timestamps[0]
+            if self._matrix is None or not len(self._matrix):
+                self._matrix = codes[np.newaxis, :]
+                self._scales = np.array([scale], dtype=np.float32)
+            else:
+                self._matrix = np.vstack([self._matrix, codes])
+                self._scales = np.append(self._scales, np.float32(scale))
+            self._results.append(result)
+            self._timestamps.append(time.monotonic())
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            self._matrix = None
+            self._scales = None
+            self._results.clear()
+            self._timestamps.clear()
@@ -6,9 +6,57 @@ All tool calls and results flow through the messages channel for better context
 
 from typing import Annotated, List
 from typing_extensions import TypedDict, NotRequired
-from langchain_core.messages import AnyMessage
+from langchain_core.messages import AnyMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.message import add_messages
 
+from database import save_tool_output
+
+# Tool outputs longer than this are truncated in state; the full text is kept in the tool_outputs table
+TOOL_OUTPUT_LIMIT = 8192
+TOOL_OUTPUT_PREVIEW = 4096
+# Pages returned by this tool are the way back to the full text, so they are never truncated
+FETCH_TOOL_NAME = "fetch_full_tool_output"
+# Node name create_react_agent gives the pre_model_hook
+PRE_MODEL_HOOK_NODE = "pre_model_hook"
+
+
+def _truncate_tool_message(message: ToolMessage, thread_id: str) -> ToolMessage:
+    """Store an oversized tool result in the database and keep only a preview in the message"""
+    if not save_tool_output(thread_id, message.tool_call_id, message.content):
+        return message  # Without a stored copy the full text would be lost, so keep it in state
+
+    preview = message.content[:TOOL_OUTPUT_PREVIEW]
+    return message.model_copy(update={"content": f"{preview}\n...[truncated, id={message.tool_call_id}]"})
+
+
+def truncate_tool_outputs(state: dict, config: RunnableConfig) -> dict:
+    """Pre-model hook that caps the tool results added since the last model call
+
+    The replacements keep their message ids, so add_messages swaps them in place and the
+    checkpointed conversation grows linearly.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    replacements = []
+    for message in reversed(state["messages"]):
+        if not isinstance(message, ToolMessage):
+            break
+        if (message.name != FETCH_TOOL_NAME and isinstance(message.content, str)
+                and len(message.content) > TOOL_OUTPUT_LIMIT):
+            replacements.append(_truncate_tool_message(message, thread_id))
+    return {"messages": replacements}
+
+
+def step_messages(step: dict):
+    """Yield the messages each node added in a stream_mode="updates" step
+
+    The pre-model hook only re-emits already streamed tool results in truncated form, so its
+    updates are skipped; otherwise every large tool result would be shown and recorded twice.
+    """
+    for node, update in step.items():
+        if node != PRE_MODEL_HOOK_NODE and isinstance(update, dict):
+            yield from update.get("messages", ())
+
 
 class AgentState(TypedDict):
     """Simplified state schema - messages-only architecture"""
@@ -18,4 +66,4 @@ class AgentState(TypedDict):
     remaining_steps: int  # Required by create_react_agent to prevent infinite loops
 
     # Minimal metadata (only what's truly needed outside of messages)
-    run_id: NotRequired[str]  # Current run ID for database operations
\ No newline at end of file
+    run_id: NotRequired[str]  # Current run ID for database operations
@@ -1,14 +1,77 @@
 from langchain_core.tools import tool
-from langsmith import Client
-from .utils import scrape_with_firecrawl, generate_gherkin_tests, generate_cypress_js_tests, format_run_header, format_feedback
-from database import search_artifacts_advanced, search_experience_advanced
+from langchain_core.runnables import RunnableConfig
+from .utils import scrape_with_firecrawl_async, format_run_header, format_feedback
+from .semantic_cache import SemanticCache
+from .state import TOOL_OUTPUT_LIMIT
+from database import get_tool_output, get_cached_query_embedding, cache_query_embedding, search_artifacts_batch, search_experience_advanced, classify_artifacts, get_embeddings
+from config import AGENT_CONFIG
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import asyncio
+import itertools
 import os
+import time
+
+# Formatted search_artifacts output per (normalized query, k), so retried searches skip DB and classification
+_ARTIFACT_RESULTS = {}
+_ARTIFACT_RESULTS_TTL = 300
+_ARTIFACT_RESULTS_MAX = 128
+
+# Shared LangSmith client so repeated status checks reuse its pooled HTTP session
+_LS_CLIENT = None
+_LS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="langsmith")
+_LS_RUN_FIELDS = ["id", "name", "run_type", "start_time", "outputs"]
+
+
+def _get_ls_client(api_key: str):
+    """Get the shared LangSmith client (imported lazily to keep langsmith off the cold-start path)"""
+    global _LS_CLIENT
+    if _LS_CLIENT is None:
+        from langsmith import Client
+        _LS_CLIENT = Client(api_key=api_key, timeout_ms=5000)
+    return _LS_CLIENT
+
+
+# Near-identical experience queries reuse earlier results instead of hitting pgvector again
+_EXPERIENCE_CACHE = SemanticCache(threshold=0.95, ttl=3600)
+
+
+class _EmbeddingBatcher:
+    """Coalesce queries issued within a short window into a single embeddings request"""
+
+    def __init__(self, window: float = 0.02):
+        self.window = window
+        self._pending = []
+        self._flush_task = None
+
+    async def embed(self, query: str) -> list:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((query, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.window)
+        batch, self._pending, self._flush_task = self._pending, [], None
+        try:
+            vectors = await get_embeddings().aembed_documents([query for query, _ in batch])
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():  # The waiting call may have been cancelled
+                    future.set_result(vector)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+_EMBEDDING_BATCHER = _EmbeddingBatcher()
 
 
 @tool
-def scrape_url(url: str) -> str:
-    """Scrape web page content"""
-    result = scrape_with_firecrawl(url)
+async def scrape_url(url: str, force_refresh: bool = False) -> str:
+    """Scrape web page content (cached for an hour; set force_refresh to bypass the cache)"""
+    result = await scrape_with_firecrawl_async(url, force_refresh=force_refresh)
     return f"✅ Scraped {url}\n\n{result}" if result else f"❌ Error: Failed to scrape {url}"
 
 
@@ -59,6 +122,15 @@ Generate {format_name} test code that covers:
 Now converting the requirements into {format_name} test code..."""
 
 
+def _feedback_lines(client, run_id) -> list:
+    """Stream a run's feedback into formatted lines, or nothing if it has none"""
+    feedback_iter = iter(client.list_feedback(run_ids=[run_id], limit=AGENT_CONFIG["feedback_limit"]))
+    first = next(feedback_iter, None)
+    if first is None:
+        return []
+    return format_feedback(itertools.chain([first], feedback_iter))
+
+
 @tool
 def show_status(metric_name: str = None) -> str:
     """Display latest evaluation metrics from LangSmith evaluators project."""
@@ -67,40 +139,39 @@ def show_status(metric_name: str = None) -> str:
         return "❌ Error: LANGSMITH_API_KEY not found in environment variables."
     
     try:
-        client = Client(api_key=ls_api_key)
-        runs = list(client.list_runs(project_name="evaluators", limit=20))
-        
-        if not runs:
-            return "No runs found in 'evaluators' project."
-        
-        # Find first run with numeric outputs
-        for run in runs:
+        client = _get_ls_client(ls_api_key)
+        # list_runs pages lazily, so stopping at the first run with metrics skips parsing the rest
+        runs_seen = False
+        needle = metric_name.lower() if metric_name else None
+        for run in client.list_runs(project_name="evaluators", limit=20, select=_LS_RUN_FIELDS):
+            runs_seen = True
             if not run.outputs:
                 continue
                 
-            metrics = {k: v for k, v in run.outputs.items() if isinstance(v, (int, float))}
+            metrics = {
+                k: v for k, v in run.outputs.items()
+                if isinstance(v, (int, float)) and (needle is None or needle in k.lower())
+            }
             if not metrics:
-                continue
+                available = [k for k, v in run.outputs.items() if isinstance(v, (int, float))]
+                if not available:
+                    continue
+                return f"Metric '{metric_name}' not found. Available: {available}"
+            
+            # Fetch feedback in the background while the metric lines are assembled
+            feedback_future = _LS_EXECUTOR.submit(_feedback_lines, client, run.id)
             
             # Build response header
             lines = [format_run_header(run), "\nMetrics:"]
-            
-            # Add metrics
-            if metric_name:
-                matching = {k: v for k, v in metrics.items() if metric_name.lower() in k.lower()}
-                if not matching:
-                    return f"Metric '{metric_name}' not found. Available: {list(metrics.keys())}"
-                metrics = matching
-            
             lines.extend(f"- {k}: {v}" for k, v in metrics.items())
             
             # Add feedback if available
-            feedback = list(client.list_feedback(run_ids=[run.id]))
-            if feedback:
-                lines.extend(format_feedback(feedback))
+            lines.extend(feedback_future.result())
             
             return "\n".join(lines)
         
+        if not runs_seen:
+            return "No runs found in 'evaluators' project."
         return "No evaluation metrics found in recent runs."
         
     except Exception as e:
@@ -108,30 +179,61 @@ def show_status(metric_name: str = None) -> str:
 
 
 @tool
-def search_experience(query: str) -> str:
+async def search_experience(query: str) -> str:
     """Search historical testing experiences and workflow patterns"""
-    # Use dedicated function to search only tool execution records
-    results = search_experience_advanced(query, k=5)
-    if not results:
-        return f"🔍 No experience found for '{query}'"
-    
-    # Filter by distance and format results
-    experience_results = []
-    for result in results:
-        distance = result.get('metadata', {}).get('distance', 0)
-        if distance > 0.8:
-            continue
-        experience_results.append(result)
-    
+    # Repeated queries reuse their cached embedding; new ones share one batched embeddings request.
+    # Distance filtering happens in SQL
+    query_vector = get_cached_query_embedding(query)
+    if query_vector is None:
+        try:
+            query_vector = await _EMBEDDING_BATCHER.embed(query)
+        except Exception as e:
+            return f"❌ Error: Failed to embed query '{query}': {str(e)}"
+        cache_query_embedding(query, query_vector)
+    experience_results = _EXPERIENCE_CACHE.get(query_vector)
+    if experience_results is None:
+        experience_results = await asyncio.to_thread(
+            search_experience_advanced, query, k=AGENT_CONFIG["experience_k"], distance_threshold=AGENT_CONFIG["experience_max_distance"], query_vector=query_vector
+        )
+        # No-hit results are not cached: experience saved later must show up on the next search
+        if experience_results:
+            _EXPERIENCE_CACHE.put(query_vector, experience_results)
     if not experience_results:
         return f"🔍 No testing experience found for '{query}'"
     
-    formatted = []
-    for i, result in enumerate(experience_results, 1):
-        summary = result.get('summary', '')[:100]
-        formatted.append(f"**{i}.** {summary}...")
-    
-    return f"📚 Found {len(formatted)} testing experiences:\n" + "\n".join(formatted)
+    body = "\n".join(f"**{i}.** {hit.summary[:100]}..." for i, hit in enumerate(experience_results, 1))
+    return f"📚 Found {len(experience_results)} testing experiences:\n{body}"
+
+
+def _search_artifacts(queries: List[str]) -> str:
+    """Run one batched artifact search and format the merged, classified hits"""
+    label = "', '".join(queries)
+    k = AGENT_CONFIG["artifacts_k"]
+    cache_key = (tuple(sorted(q.strip().lower() for q in queries)), k)
+    cached = _ARTIFACT_RESULTS.get(cache_key)
+    if cached and time.monotonic() - cached[0] < _ARTIFACT_RESULTS_TTL:
+        return cached[1]
+
+    results = search_artifacts_batch(queries, k=k, distance_threshold=AGENT_CONFIG["artifact_max_distance"])
+    output = _format_artifacts(label, results)
+    if results:
+        if len(_ARTIFACT_RESULTS) >= _ARTIFACT_RESULTS_MAX:
+            _ARTIFACT_RESULTS.pop(next(iter(_ARTIFACT_RESULTS)))
+        _ARTIFACT_RESULTS[cache_key] = (time.monotonic(), output)
+    return output
+
+
+@tool
+def search_artifacts_many(queries: List[str]) -> str:
+    """Search for content artifacts (requirements, test code) with several queries at once
+
+    Prefer this over repeated search_artifacts calls: all queries share one embedding request
+    and one database round trip, and the results are merged.
+
+    Example:
+    - search_artifacts_many(["book title price add cart button", "book listing pagination test"])
+    """
+    return _search_artifacts(queries)
 
 
 @tool
@@ -145,56 +247,58 @@ def search_artifacts(query: str) -> str:
     - After scraping a book store: search_artifacts("book title price add cart button listing")
     - After generating requirements: search_artifacts("login form validation error handling")
     """
-    results = search_artifacts_advanced(query, k=8)
+    return _search_artifacts([query])
+
+
+def _format_hit_block(formatted: list, header: str, hits: list, limit: int):
+    """Append a header and URL + content preview lines for the first few hits"""
+    formatted.append(header)
+    for i, hit in enumerate(itertools.islice(hits, limit), 1):
+        # Slice before replace so only the preview is copied, not the whole content
+        content_preview = hit.content[:250].replace('\n', ' ')
+        formatted.append(f"\n{i}. URL: {hit.url or 'unknown'}")
+        formatted.append(f"   {content_preview}...")
+
+
+def _format_artifacts(query: str, results: list) -> str:
+    """Format classified search hits as requirements, test code and other content"""
     if not results:
         return f"🔍 No artifacts found for '{query}'"
     
-    # Classify results
-    requirements_results = []
-    test_code_results = []
-    other_content = []
-    
-    for result in results:
-        distance = result.get('metadata', {}).get('distance', 0)
-        if distance > 0.9:  # Relaxed threshold for better search results
-            continue
-            
-        content = result.get('content', '')
-        
-        # Check if it's requirements content
-        if ('functional requirements' in content.lower() or 
-            (content.count('- ') >= 2 and content.count('\n') >= 3)):
-            requirements_results.append(result)
-        # Check if it's test code
-        elif any(keyword in content.lower() for keyword in 
-                ['scenario:', 'given', 'when', 'then', 'feature:', 'describe(', 'it(', 'cy.']):
-            test_code_results.append(result)
-        else:
-            other_content.append(result)
+    classified = classify_artifacts(results)
+    requirements_results = classified["requirements"]
+    test_code_results = classified["test_code"]
+    other_content = classified["other"]
     
     # Build return results
     formatted = []
     
     if requirements_results:
-        formatted.append("📋 **Found Requirements:**")
-        for i, req in enumerate(requirements_results[:3], 1):
-            url = req.get('metadata', {}).get('url', 'unknown')
-            content_preview = req.get('content', '')[:250].replace('\n', ' ')
-            formatted.append(f"\n{i}. URL: {url}")
-            formatted.append(f"   {content_preview}...")
+        _format_hit_block(formatted, "📋 **Found Requirements:**", requirements_results, 3)
     
     if test_code_results:
-        formatted.append("\n🧪 **Found Test Code:**")
-        for i, test in enumerate(test_code_results[:3], 1):
-            url = test.get('metadata', {}).get('url', 'unknown')
-            content_preview = test.get('content', '')[:250].replace('\n', ' ')
-            formatted.append(f"\n{i}. URL: {url}")
-            formatted.append(f"   {content_preview}...")
+        _format_hit_block(formatted, "\n🧪 **Found Test Code:**", test_code_results, 3)
     
     if other_content and len(formatted) < 8:
         formatted.append("\n📄 **Other Content:**")
-        for i, other in enumerate(other_content[:2], 1):
-            summary = other.get('summary', '')[:100]
+        for i, other in enumerate(itertools.islice(other_content, 2), 1):
+            summary = other.summary[:100]
             formatted.append(f"{i}. {summary}...")
     
     return "\n".join(formatted) if formatted else f"🔍 No relevant artifacts found for '{query}'"
+
+
+@tool
+def fetch_full_tool_output(id: str, config: RunnableConfig, offset: int = 0) -> str:
+    """Fetch the full content of a tool result that was truncated with "[truncated, id=...]"
+
+    Returns up to 8192 characters starting at offset; call again with the next offset for the rest.
+    """
+    stored = get_tool_output(config["configurable"]["thread_id"], id, offset, TOOL_OUTPUT_LIMIT)
+    if stored is None:
+        return f"❌ Error: No stored tool output for id '{id}'"
+    text, total = stored
+    end = offset + len(text)
+    if end < total:
+        text += f"\n...[characters {offset}-{end} of {total}; call again with offset={end} for more]"
+    return text
@@ -1,5 +1,12 @@
+import io
 import os
-import json
+import re
+import time
+import sqlite3
+import asyncio
+import functools
+import threading
+import orjson
 from typing import Optional, Dict
 
 try:
@@ -8,22 +15,135 @@ try:
 except ImportError:
     FIRECRAWL_AVAILABLE = False
 
+try:
+    from firecrawl import AsyncFirecrawlApp
+    ASYNC_FIRECRAWL_AVAILABLE = True
+except ImportError:
+    ASYNC_FIRECRAWL_AVAILABLE = False
+
+try:
+    import openai
+    from langchain_openai import ChatOpenAI
+    from agent.prompt import SMART_SUMMARY_SYSTEM_MESSAGE, SMART_SUMMARY_USER_TEMPLATE
+    SUMMARY_AVAILABLE = True
+except ImportError:
+    SUMMARY_AVAILABLE = False
+
+# Disk-backed scrape cache so repeated runs against the same URL skip the Firecrawl round trip
+SCRAPE_CACHE_PATH = os.getenv("SCRAPE_CACHE_PATH", os.path.join(".cache", "scrape.sqlite"))
+SCRAPE_CACHE_TTL = 3600
+
+# Shared Firecrawl clients, recreated only if the API key changes
+_FIRECRAWL_APP = None
+_FIRECRAWL_KEY = None
+_ASYNC_FIRECRAWL_APP = None
+_ASYNC_FIRECRAWL_KEY = None
+
+# Shared scrape cache connection, opened (and the table created) on first use
+_SCRAPE_CACHE_CONN: Optional[sqlite3.Connection] = None
+_SCRAPE_CACHE_LOCK = threading.Lock()
+
+
+def _format_scrape_result(url: str, result) -> Optional[str]:
+    """Format a Firecrawl scrape result as markdown with title and URL header"""
+    if result and hasattr(result, 'markdown') and result.markdown:
+        metadata = getattr(result, 'metadata', {})
+        title = metadata.get('title', 'N/A')
+        return f"📄 **{title}**\n🔗 **{url}**\n\n{result.markdown}"
+    return None
+
+
 def scrape_with_firecrawl(url: str) -> Optional[str]:
-    if not FIRECRAWL_AVAILABLE or not os.getenv("FIRECRAWL_API_KEY"):
+    global _FIRECRAWL_APP, _FIRECRAWL_KEY
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    if not FIRECRAWL_AVAILABLE or not api_key:
         return None
     
     try:
-        app = FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
-        result = app.scrape_url(url, formats=['markdown'])
-        
-        if result and hasattr(result, 'markdown') and result.markdown:
-            metadata = getattr(result, 'metadata', {})
-            title = metadata.get('title', 'N/A')
-            return f"📄 **{title}**\n🔗 **{url}**\n\n{result.markdown}"
+        if _FIRECRAWL_APP is None or _FIRECRAWL_KEY != api_key:
+            _FIRECRAWL_APP = FirecrawlApp(api_key=api_key)
+            _FIRECRAWL_KEY = api_key
+        result = _FIRECRAWL_APP.scrape_url(url, formats=['markdown'])
+        return _format_scrape_result(url, result)
+    except Exception as e:
+        print(f"❌ Firecrawl scrape failed: {repr(e)}")
         return None
-    except:
+
+
+def _scrape_cache_connect() -> sqlite3.Connection:
+    """Get the shared scrape cache connection; callers must hold _SCRAPE_CACHE_LOCK"""
+    global _SCRAPE_CACHE_CONN
+    if _SCRAPE_CACHE_CONN is None:
+        os.makedirs(os.path.dirname(SCRAPE_CACHE_PATH) or ".", exist_ok=True)
+        # Used from worker threads, serialized by _SCRAPE_CACHE_LOCK
+        conn = sqlite3.connect(SCRAPE_CACHE_PATH, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS scrape_cache (url TEXT PRIMARY KEY, content TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        _SCRAPE_CACHE_CONN = conn
+    return _SCRAPE_CACHE_CONN
+
+
+def get_cached_scrape(url: str) -> Optional[str]:
+    """Get a cached scrape result for the URL if it is younger than the TTL"""
+    try:
+        with _SCRAPE_CACHE_LOCK:
+            row = _scrape_cache_connect().execute(
+                "SELECT content FROM scrape_cache WHERE url = ? AND fetched_at > ?",
+                (url, time.time() - SCRAPE_CACHE_TTL)
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"⚠️ Scrape cache read failed: {repr(e)}")
         return None
 
+
+def store_cached_scrape(url: str, content: str):
+    """Store a scrape result in the cache"""
+    try:
+        with _SCRAPE_CACHE_LOCK, _scrape_cache_connect() as conn:  # Commits the insert
+            conn.execute(
+                "INSERT OR REPLACE INTO scrape_cache (url, content, fetched_at) VALUES (?, ?, ?)",
+                (url, content, time.time())
+            )
+    except sqlite3.Error as e:
+        print(f"⚠️ Scrape cache write failed: {repr(e)}")
+
+
+async def _fetch_with_firecrawl_async(url: str) -> Optional[str]:
+    global _ASYNC_FIRECRAWL_APP, _ASYNC_FIRECRAWL_KEY
+    if not ASYNC_FIRECRAWL_AVAILABLE:
+        return await asyncio.to_thread(scrape_with_firecrawl, url)
+
+    api_key = os.getenv("FIRECRAWL_API_KEY")
+    if not api_key:
+        return None
+
+    try:
+        if _ASYNC_FIRECRAWL_APP is None or _ASYNC_FIRECRAWL_KEY != api_key:
+            _ASYNC_FIRECRAWL_APP = AsyncFirecrawlApp(api_key=api_key)
+            _ASYNC_FIRECRAWL_KEY = api_key
+        result = await _ASYNC_FIRECRAWL_APP.scrape_url(url, formats=['markdown'])
+        return _format_scrape_result(url, result)
+    except Exception as e:
+        print(f"❌ Firecrawl scrape failed: {repr(e)}")
+        return None
+
+
+async def scrape_with_firecrawl_async(url: str, force_refresh: bool = False) -> Optional[str]:
+    """Scrape without blocking the event loop, using the async Firecrawl client when available
+
+    Results are served from the disk cache for SCRAPE_CACHE_TTL seconds unless force_refresh is set.
+    """
+    # sqlite calls block, so they run in a worker thread
+    if not force_refresh:
+        cached = await asyncio.to_thread(get_cached_scrape, url)
+        if cached is not None:
+            return cached
+
+    result = await _fetch_with_firecrawl_async(url)
+    if result:
+        await asyncio.to_thread(store_cached_scrape, url, result)
+    return result
+
 # Gherkin scenario templates
 GHERKIN_TEMPLATES = {
     'login': """
@@ -54,28 +174,43 @@ Scenario: {requirement}
 """
 }
 
-def _generate_scenario(requirement: str, template_type: str) -> str:
-    """Generate a scenario based on template type"""
-    template = GHERKIN_TEMPLATES.get(template_type, GHERKIN_TEMPLATES['default'])
-    return template.format(requirement=requirement)
+# Requirement bullet lines ("- ...") and the keyword that selects a template
+_REQ_RE = re.compile(r'^[ \t]*-[ \t]+(.*?)[ \t]*$', re.M)
+_TEMPLATE_KEYWORDS = ('login', 'form', 'navigation')
+
+
+def _template_parts(templates: Dict[str, str]) -> Dict[str, list]:
+    """Pre-split format templates around {requirement} so filling one is a single join"""
+    return {
+        name: [part.replace('{{', '{').replace('}}', '}') for part in template.split('{requirement}')]
+        for name, template in templates.items()
+    }
+
+
+def _template_type(requirement: str) -> str:
+    """Pick the template type based on requirement content"""
+    lowered = requirement.lower()
+    for keyword in _TEMPLATE_KEYWORDS:
+        if keyword in lowered:
+            return keyword
+    return 'default'
+
+
+_GHERKIN_PARTS = _template_parts(GHERKIN_TEMPLATES)
 
 
 def generate_gherkin_tests(requirements: str) -> str:
-    lines = [line.strip()[2:] for line in requirements.split('\n') if line.strip().startswith('- ')]
+    lines = _REQ_RE.findall(requirements)
     if not lines:
         lines = ["Basic page functionality"]
     
-    scenarios = []
-    for req in lines:
-        # Determine template type based on requirement content
-        template_type = 'default'
-        for keyword in ['login', 'form', 'navigation']:
-            if keyword in req.lower():
-                template_type = keyword
-                break
-        scenarios.append(_generate_scenario(req, template_type))
-    
-    return "Feature: Web Page Testing\n" + "\n".join(scenarios)
+    buf = io.StringIO()
+    buf.write("Feature: Web Page Testing\n")
+    for i, req in enumerate(lines):
+        if i:
+            buf.write("\n")
+        buf.write(req.join(_GHERKIN_PARTS[_template_type(req)]))
+    return buf.getvalue()
 
 # Cypress test templates
 CYPRESS_TEMPLATES = {
@@ -111,28 +246,63 @@ CYPRESS_TEMPLATES = {
   }});"""
 }
 
-def _generate_cypress_test(requirement: str, template_type: str) -> str:
-    """Generate a Cypress test based on template type"""
-    template = CYPRESS_TEMPLATES.get(template_type, CYPRESS_TEMPLATES['default'])
-    return template.format(requirement=requirement)
+_CYPRESS_PARTS = _template_parts(CYPRESS_TEMPLATES)
 
 
 def generate_cypress_js_tests(requirements: str) -> str:
-    lines = [line.strip()[2:] for line in requirements.split('\n') if line.strip().startswith('- ')]
+    lines = _REQ_RE.findall(requirements)
     if not lines:
         lines = ["should load the page successfully"]
     
-    test_cases = []
+    buf = io.StringIO()
+    buf.write("describe('Web Page Tests', () => {\n")
     for req in lines:
-        # Determine template type based on requirement content
-        template_type = 'default'
-        for keyword in ['login', 'form', 'navigation']:
-            if keyword in req.lower():
-                template_type = keyword
-                break
-        test_cases.append(_generate_cypress_test(req, template_type))
+        buf.write(req.join(_CYPRESS_PARTS[_template_type(req)]))
+    buf.write("\n});")
+    return buf.getvalue()
+
+# Maximum number of tool result characters included in the summary prompt
+_MAX_PREVIEW = 200
+
+
+def summary_user_msg(user_request: str, tool_name: str, tool_result: str) -> str:
+    """Build the smart summary user message from a bounded preview of the tool result"""
+    return SMART_SUMMARY_USER_TEMPLATE.format(
+        user_request=user_request, tool_name=tool_name, tool_result_preview=tool_result[:_MAX_PREVIEW]
+    )
+
+
+# Shared summary model client, created on first use
+_SUMMARY_CLIENT = None
+
+
+def _get_summary_client():
+    """Get the shared gpt-4o-mini client used for smart summaries"""
+    global _SUMMARY_CLIENT
+    if _SUMMARY_CLIENT is None:
+        _SUMMARY_CLIENT = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=60)
+    return _SUMMARY_CLIENT
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_smart_summary(user_request: str, tool_name: str, preview: str) -> tuple:
+    """Summarize one (request, tool, result preview) prompt; identical prompts hit the cache"""
+    response = _get_summary_client().invoke([
+        {"role": "system", "content": SMART_SUMMARY_SYSTEM_MESSAGE},
+        {"role": "user", "content": summary_user_msg(user_request, tool_name, preview)}
+    ])
+    
+    # Try to parse the response as JSON
+    try:
+        summary_dict = orjson.loads(response.content)
+        if isinstance(summary_dict, dict) and 'request' in summary_dict and 'action' in summary_dict:
+            return tuple(summary_dict.items())
+    except orjson.JSONDecodeError:
+        # If JSON parsing fails, return a default summary
+        pass
     
-    return f"describe('Web Page Tests', () => {{\n{''.join(test_cases)}\n}});"
+    return (("request", user_request[:50]), ("action", tool_name))
+
 
 def generate_smart_summary(user_request: str, tool_name: str, tool_result: str) -> Dict[str, str]:
     """
@@ -146,32 +316,14 @@ def generate_smart_summary(user_request: str, tool_name: str, tool_result: str)
     Returns:
         A dictionary with request and action keys, and optionally a result key
     """
-    try:
-        from langchain_openai import ChatOpenAI
-        from agent.prompt import SMART_SUMMARY_SYSTEM_MESSAGE, SMART_SUMMARY_USER_TEMPLATE
-
-        client = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=60)
-        input_text = SMART_SUMMARY_USER_TEMPLATE.format(
-            user_request=user_request, tool_name=tool_name, tool_result_preview=tool_result[:200]
-        )
-        
-        response = client.invoke([
-            {"role": "system", "content": SMART_SUMMARY_SYSTEM_MESSAGE},
-            {"role": "user", "content": input_text}
-        ])
-        
-        # Try to parse the response as JSON
-        try:
-            summary_dict = json.loads(response.content)
-            if 'request' in summary_dict and 'action' in summary_dict:
-                return summary_dict
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return a default summary
-            pass
-            
+    if not SUMMARY_AVAILABLE:
         return {"request": user_request[:50], "action": tool_name}
-    except Exception as e:
-        # If any error occurs, return a default summary
+    try:
+        # Only the preview reaches the prompt, so it is all the cache key needs
+        return dict(_cached_smart_summary(user_request, tool_name, tool_result[:_MAX_PREVIEW]))
+    except (openai.OpenAIError, TimeoutError) as e:
+        # If the model call fails, return a default summary
+        print(f"⚠️ Smart summary failed: {repr(e)}")
         return {"request": user_request[:50], "action": tool_name}
 
 def format_summary_for_storage(summary_dict: Dict[str, str]) -> str:
@@ -4,21 +4,47 @@ Intelligent agent with database storage and multi-turn conversation memory
 """
 
 import asyncio
+import atexit
+import os
 import re
+import reprlib
 import uuid
-from typing import Optional, Tuple
-from agent import get_agent
+from typing import Dict, List, Optional, Tuple
+from agent import get_agent, init_checkpointer, close_checkpointer, step_messages
 from database import db
 from config import setup_environment
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    import readline  # Line editing and history recall for input(); not available on Windows
+    READLINE_AVAILABLE = True
+except ImportError:
+    READLINE_AVAILABLE = False
+
 # Constants
-URL_PATTERN = r'https?://[^\s]+'
+URL_RE = re.compile(r'https?://\S+', re.ASCII)
 DEFAULT_URL = "unknown"
 MAX_DESCRIPTION_LENGTH = 100
+HISTORY_FILE = os.path.expanduser("~/.graph_agent_history")
+ARTIFACT_FLUSH_SIZE = 16  # Buffered artifacts are written in one bulk insert once this many accumulate
+
+# Bounded repr for tool-call previews: stops after ~200 chars instead of stringifying the full args
+_ARGS_REPR = reprlib.Repr()
+_ARGS_REPR.maxstring = 200
+_ARGS_REPR.maxdict = 4
+_ARGS_REPR.maxlist = 4
 
 def extract_url_from_query(query: str) -> str:
     """Extract URL from query string"""
-    match = re.search(URL_PATTERN, query)
+    start = query.find('http')  # Cheap substring scan skips the regex for follow-up questions
+    if start < 0:
+        return DEFAULT_URL
+    match = URL_RE.search(query, start)
     return match.group(0) if match else DEFAULT_URL
 
 
@@ -27,19 +53,22 @@ class SessionManager:
     
     def __init__(self):
         self.current_thread_id: Optional[str] = None
+        self.config: Optional[dict] = None
         self.agent = None
     
     def get_or_create_session(self) -> Tuple[dict, object]:
         """Get or create session"""
         if not self.current_thread_id:
             self.current_thread_id = str(uuid.uuid4())
+            self.config = {"configurable": {"thread_id": self.current_thread_id}}
             self.agent = get_agent()
             print(f"🆕 New conversation started, session ID: {self.current_thread_id}")
-        return {"configurable": {"thread_id": self.current_thread_id}}, self.agent
+        return self.config, self.agent
     
     def reset_session(self):
         """Reset session"""
         self.current_thread_id = None
+        self.config = None
         self.agent = None
         print("🔄 Conversation reset")
 
@@ -47,17 +76,41 @@ class SessionManager:
 session_manager = SessionManager()
 
 
-async def record_artifact(
-    run_id: str, 
-    artifact_type: str, 
-    content: str, 
-    user_request: str, 
-    url: str, 
-    tool_name: str = ""
-):
-    """Record artifact to database"""
-    if run_id:
-        await db.save_artifact(run_id, artifact_type, content, url, user_request, tool_name or artifact_type)
+class ArtifactBuffer:
+    """Collects a run's artifacts and writes them in bulk from background tasks
+
+    The agent stream never waits on the database; drain() is awaited once before the run status is set.
+    """
+    
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.items: List[Dict[str, str]] = []
+        self.writes: List[asyncio.Task] = []
+    
+    def add(self, artifact_type: str, content: str, user_request: str, url: str, tool_name: str = ""):
+        """Buffer an artifact, starting a bulk write once the buffer is full"""
+        if self.run_id:
+            self.items.append({
+                "type": artifact_type, "text": content, "url": url,
+                "user_request": user_request, "tool_name": tool_name or artifact_type
+            })
+            if len(self.items) >= ARTIFACT_FLUSH_SIZE:
+                self.flush()
+    
+    def flush(self):
+        """Start a background bulk write of the buffered artifacts"""
+        if self.run_id and self.items:
+            # The CLI never shows the summaries, so they are written in the background after the insert
+            self.writes.append(asyncio.create_task(
+                db.save_artifacts_bulk(self.run_id, self.items, background_summary=True)
+            ))
+            self.items = []
+    
+    async def drain(self):
+        """Write whatever is buffered and wait for all pending writes"""
+        self.flush()
+        await asyncio.gather(*self.writes)
+        self.writes.clear()
 
 
 async def run_with_database(query: str):
@@ -72,49 +125,50 @@ async def run_with_database(query: str):
     if not run_id:
         print("⚠️ Database unavailable, running agent only")
 
+    artifacts = ArtifactBuffer(run_id)
     try:
         config, session_agent = session_manager.get_or_create_session()
         
         async for step in session_agent.astream(
             {"messages": [{"role": "user", "content": query}], "run_id": run_id},
             config,
-            stream_mode="values"
+            stream_mode="updates"
         ):
-            await _process_agent_step(step, run_id, query, url)
+            _process_agent_step(step, artifacts, query, url)
 
+        await artifacts.drain()
         if run_id:
             await db.update_run_status(run_id, "completed")
             print(f"✅ Run completed: {run_id}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        await artifacts.drain()
         if run_id:
             await db.update_run_status(run_id, "error")
 
 
-async def _process_agent_step(step: dict, run_id: str, query: str, url: str):
-    """Process individual agent step"""
-    if "messages" not in step:
-        return
+def _process_agent_step(step: dict, artifacts: ArtifactBuffer, query: str, url: str):
+    """Process the messages each node added in one stream_mode="updates" step"""
+    for message in step_messages(step):
+        message.pretty_print()
         
-    last_message = step["messages"][-1]
-    last_message.pretty_print()
-    
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        await _handle_tool_calls(last_message.tool_calls, run_id, query, url)
-    elif hasattr(last_message, 'tool_call_id'):
-        await record_artifact(run_id, "tool_result", last_message.content, query, url)
+        kind = message.type
+        if kind == 'ai' and message.tool_calls:
+            _handle_tool_calls(message.tool_calls, artifacts, query, url)
+        elif kind == 'tool':
+            artifacts.add("tool_result", message.content, query, url)
 
 
-async def _handle_tool_calls(tool_calls: list, run_id: str, query: str, url: str):
+def _handle_tool_calls(tool_calls: list, artifacts: ArtifactBuffer, query: str, url: str):
     """Handle tool calls and record artifacts"""
     for tool_call in tool_calls:
         tool_name = tool_call["name"]
         tool_args = tool_call.get("args", {})
-        args_preview = str(tool_args)[:200]
+        args_preview = _ARGS_REPR.repr(tool_args)
         call_info = f"Tool: {tool_name}, Args: {args_preview}"
         
-        await record_artifact(run_id, "tool_call", call_info, query, url, tool_name)
+        artifacts.add("tool_call", call_info, query, url, tool_name)
         
         display_name = (
             f"Search experience: {tool_args.get('query', 'unknown')}" 
@@ -133,10 +187,23 @@ async def show_recent_runs():
         status_emoji = {"completed": "✅", "error": "❌"}.get(run['status'], "⏳")
         print(f"{status_emoji} ID:{run['run_id']} | {run['url']} | {run['status']} | {run['start_ts']}")
 
+def _setup_readline():
+    """Load the persistent query history and save it again on exit"""
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    readline.set_history_length(1000)
+    atexit.register(readline.write_history_file, HISTORY_FILE)
+
+
 async def main():
     """Main function"""
     setup_environment()
+    if READLINE_AVAILABLE:
+        _setup_readline()
     await db.connect()
+    await init_checkpointer()
 
     print("🚀 Web Testing Agent")
     print("=" * 50)
@@ -144,24 +211,17 @@ async def main():
     try:
         await _interactive_mode()
     finally:
+        await close_checkpointer()
         await db.close()
 
 
-def _is_quit_command(user_input: str) -> bool:
-    """Check if user input is a quit command"""
-    return user_input.lower() in ('quit', 'exit', 'q')
-
-def _is_history_command(user_input: str) -> bool:
-    """Check if user input is a history command"""
-    return user_input.lower() in ('history', 'h')
-
-def _is_new_session_command(user_input: str) -> bool:
-    """Check if user input is a new session command"""
-    return user_input.lower() in ('new', 'n')
-
-def _is_reset_command(user_input: str) -> bool:
-    """Check if user input is a reset command"""
-    return user_input.lower() in ('reset', 'r')
+# Interactive commands and their aliases, resolved with one lookup per input line
+COMMANDS = {
+    'quit': 'quit', 'exit': 'quit', 'q': 'quit',
+    'history': 'history', 'h': 'history',
+    'new': 'new', 'n': 'new',
+    'reset': 'reset', 'r': 'reset',
+}
 
 
 async def _interactive_mode():
@@ -174,18 +234,21 @@ async def _interactive_mode():
         if not user_input:
             continue
             
-        # Handle commands using helper functions
-        if _is_quit_command(user_input):
+        # Handle commands
+        command = COMMANDS.get(user_input.lower())
+        if command == 'quit':
             print("👋 Goodbye!")
             break
-        elif _is_history_command(user_input):
+        elif command == 'history':
             await show_recent_runs()
-        elif _is_new_session_command(user_input):
+        elif command == 'new':
             session_manager.get_or_create_session()
-        elif _is_reset_command(user_input):
+        elif command == 'reset':
             session_manager.reset_session()
         else:
             await run_with_database(user_input)
 
 if __name__ == "__main__":
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     asyncio.run(main())
@@ -4,34 +4,35 @@ Manages API keys and other configuration items
 """
 
 import os
+import re
 from typing import Optional
 
+# KEY=value lines; comment lines never match since '#' cannot start a key
+_ENV_LINE_RE = re.compile(r'^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=(.*)$', re.M)
+_env_loaded = False
+
 
 class ConfigManager:
     """Configuration manager for API keys and environment setup"""
     
     @staticmethod
     def load_env_file():
-        """Load environment variables from .env file"""
+        """Load environment variables from .env file (parsed once per process)"""
+        global _env_loaded
         env_file = ".env"
-        if not os.path.exists(env_file):
+        if _env_loaded or not os.path.exists(env_file):
             return
             
         with open(env_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    value = value.strip('"\'')
-                    # Only set if not already in environment (don't override Docker env vars)
-                    if key not in os.environ:
-                        os.environ[key] = value
+            content = f.read()
+        for match in _ENV_LINE_RE.finditer(content):
+            # Only set if not already in environment (don't override Docker env vars)
+            os.environ.setdefault(match.group(1), match.group(2).strip().strip('"\''))
+        _env_loaded = True
 
     @staticmethod
     def get_api_key(key_name: str, required: bool = True) -> Optional[str]:
-        """Get API key with validation"""
-        ConfigManager.load_env_file()
-
+        """Get API key with validation (expects load_env_file to have run)"""
         api_key = os.getenv(key_name)
         placeholder = f"your-{key_name.lower().replace('_', '-')}-here"
         
@@ -59,6 +60,7 @@ class ConfigManager:
 def setup_environment() -> bool:
     """Setup runtime environment"""
     print("🔧 Configuring runtime environment...")
+    ConfigManager.load_env_file()
 
     if not ConfigManager.get_api_key("OPENAI_API_KEY", required=True):
         return False
@@ -91,5 +93,11 @@ AGENT_CONFIG = {
     "verbose": True,
     "stream_mode": "values",
     "use_memory": True,
-    "checkpointer_type": "memory"
+    "checkpointer_type": "memory",
+    "hnsw_ef_search": 100,  # Minimum HNSW candidate list size per vector search (raised to 10*k for larger k)
+    "experience_k": 5,  # Neighbors returned by search_experience
+    "artifacts_k": 8,  # Neighbors returned by search_artifacts
+    "experience_max_distance": 0.8,  # Cosine distance cutoff applied in SQL for search_experience
+    "artifact_max_distance": 0.9,  # Relaxed cutoff for search_artifacts, for better recall
+    "feedback_limit": 10,  # Feedback entries fetched per run by show_status
 }
@@ -3,35 +3,226 @@ Database module - PostgreSQL + PGVector for web testing automation
 """
 
 import os
+import re
 import hashlib
+import threading
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+from pgvector import HalfVector
+from pgvector.psycopg import register_vector
 import uuid
+from dataclasses import dataclass
 from typing import Optional, List, Dict, Any
 from langchain_openai import OpenAIEmbeddings
+from config import AGENT_CONFIG
 
 # CONN_STR will be initialized in init_database() to ensure environment variables are loaded
 CONN_STR = None
+# Shared connection pool, so helpers reuse connections instead of reconnecting per call
+_POOL: Optional[ConnectionPool] = None
+# Set by close_pool(); late callers get an error instead of silently opening a new pool
+_POOL_CLOSED = False
 
 _EMBEDDER = None
 
+
+@dataclass(slots=True)
+class ArtifactHit:
+    """Single semantic search result"""
+    doc_id: str
+    run_id: str
+    type: str
+    content: str
+    summary: str
+    timestamp: str
+    url: str
+    distance: float
+
+
+def _hit_row(cursor):
+    """psycopg row factory that builds ArtifactHit objects straight from result tuples"""
+    return _row_to_hit
+
+
+def _row_to_hit(row) -> ArtifactHit:
+    return ArtifactHit(
+        doc_id=row[0], run_id=row[1], type=row[2], content=row[3],
+        summary=row[4] or row[3][:200],
+        timestamp=str(row[5]) if row[5] else "",
+        url=row[6] or "",
+        distance=float(row[7])
+    )
+
+
 def get_embeddings():
     global _EMBEDDER
     if _EMBEDDER is None:
-        _EMBEDDER = OpenAIEmbeddings(model="text-embedding-3-small", dimensions=512)
+        # Rate-limited (429) requests are retried with exponential backoff by the OpenAI client.
+        # Explicit HTTP/2 clients keep one pooled, multiplexed connection alive for sync and async calls.
+        limits = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+        _EMBEDDER = OpenAIEmbeddings(
+            model="text-embedding-3-small", dimensions=512, max_retries=5,
+            http_client=httpx.Client(http2=True, limits=limits),
+            http_async_client=httpx.AsyncClient(http2=True, limits=limits)
+        )
     return _EMBEDDER
 
-def _to_vector_literal(vec: list[float]) -> str:
-    return '[' + ','.join(f'{v:.6f}' for v in vec) + ']'
+
+# LRU cache of query embeddings keyed by normalized query text
+_QUERY_EMBEDDINGS: "OrderedDict[str, List[float]]" = OrderedDict()
+_QUERY_EMBEDDINGS_MAX = 512
+_QUERY_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def _remember_query_embeddings(entries: Dict[str, List[float]]):
+    """Add or refresh query embeddings in the LRU cache; the caller holds _QUERY_EMBEDDINGS_LOCK"""
+    for q, vector in entries.items():
+        _QUERY_EMBEDDINGS[q] = vector
+        _QUERY_EMBEDDINGS.move_to_end(q)
+    while len(_QUERY_EMBEDDINGS) > _QUERY_EMBEDDINGS_MAX:
+        _QUERY_EMBEDDINGS.popitem(last=False)
+
+
+def embed_queries_cached(queries: List[str]) -> List[List[float]]:
+    """Embed search queries, reusing cached embeddings and batching the rest into one request"""
+    normalized = [q.strip().lower() for q in queries]
+    with _QUERY_EMBEDDINGS_LOCK:
+        found = {q: _QUERY_EMBEDDINGS[q] for q in normalized if q in _QUERY_EMBEDDINGS}
+    missing = [q for q in dict.fromkeys(normalized) if q not in found]
+    if missing:
+        found.update(zip(missing, get_embeddings().embed_documents(missing)))
+    with _QUERY_EMBEDDINGS_LOCK:
+        _remember_query_embeddings({q: found[q] for q in normalized})
+    return [found[q] for q in normalized]
+
+
+def embed_query_cached(query: str) -> List[float]:
+    """Embed a search query, reusing embeddings of previously seen (normalized) queries"""
+    return embed_queries_cached([query])[0]
+
+
+def get_cached_query_embedding(query: str) -> Optional[List[float]]:
+    """Return the cached embedding of a search query, or None if it has not been embedded yet"""
+    key = query.strip().lower()
+    with _QUERY_EMBEDDINGS_LOCK:
+        vector = _QUERY_EMBEDDINGS.get(key)
+        if vector is not None:
+            _QUERY_EMBEDDINGS.move_to_end(key)
+    return vector
+
+
+def cache_query_embedding(query: str, vector: List[float]):
+    """Add an embedding computed elsewhere (e.g. by a batched async request) to the query cache"""
+    with _QUERY_EMBEDDINGS_LOCK:
+        _remember_query_embeddings({query.strip().lower(): vector})
+
+
+# LRU cache of document embeddings keyed by content hash, backed by the embedding_cache table
+_TEXT_EMBEDDINGS: "OrderedDict[str, List[float]]" = OrderedDict()
+_TEXT_EMBEDDINGS_MAX = 4096
+_TEXT_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def _content_hash(text: str) -> str:
+    """Hash artifact text once; the digest keys the embedding cache and its prefix forms the artifact id"""
+    return hashlib.blake2b(text.encode(), digest_size=16, usedforsecurity=False).hexdigest()
+
+
+def _load_cached_embeddings(hashes: List[str]) -> Dict[str, List[float]]:
+    """Fetch embeddings stored by any process from the embedding_cache table"""
+    try:
+        with _get_pool().connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT hash, embedding::vector::real[] FROM embedding_cache WHERE hash = ANY(%s)", (hashes,))
+                return {row[0]: list(row[1]) for row in cur.fetchall()}
+    except Exception as e:
+        print(f"⚠️ Embedding cache read failed: {repr(e)}")
+        return {}
+
+
+def _store_cached_embeddings(entries: Dict[str, List[float]]):
+    try:
+        with _get_pool().connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    "INSERT INTO embedding_cache (hash, embedding) VALUES (%s, %s) ON CONFLICT (hash) DO NOTHING",
+                    [(h, _to_halfvec(vector)) for h, vector in entries.items()]
+                )
+                conn.commit()
+    except Exception as e:
+        print(f"⚠️ Embedding cache write failed: {repr(e)}")
+
+
+def embed_texts_cached(texts: List[str], hashes: Optional[List[str]] = None) -> List[List[float]]:
+    """Embed artifact texts, reusing embeddings of identical content from memory or the database"""
+    hashes = hashes or [_content_hash(text) for text in texts]
+    with _TEXT_EMBEDDINGS_LOCK:
+        found = {h: _TEXT_EMBEDDINGS[h] for h in hashes if h in _TEXT_EMBEDDINGS}
+    missing = [h for h in dict.fromkeys(hashes) if h not in found]
+    if missing:
+        found.update(_load_cached_embeddings(missing))
+        to_embed = {h: text for h, text in zip(hashes, texts) if h not in found}
+        if to_embed:
+            fresh = dict(zip(to_embed, get_embeddings().embed_documents(list(to_embed.values()))))
+            found.update(fresh)
+            _store_cached_embeddings(fresh)
+    with _TEXT_EMBEDDINGS_LOCK:
+        for h in hashes:
+            _TEXT_EMBEDDINGS[h] = found[h]
+            _TEXT_EMBEDDINGS.move_to_end(h)
+        while len(_TEXT_EMBEDDINGS) > _TEXT_EMBEDDINGS_MAX:
+            _TEXT_EMBEDDINGS.popitem(last=False)
+    return [found[h] for h in hashes]
+
+
+def _to_halfvec(vec: List[float]) -> HalfVector:
+    """Wrap an embedding so psycopg sends it in pgvector's binary halfvec format"""
+    return HalfVector(vec)
+
+
+def _get_pool() -> ConnectionPool:
+    """Get the shared connection pool, creating it on first use"""
+    global _POOL
+    if _POOL is None:
+        if _POOL_CLOSED:
+            raise RuntimeError("Database connection pool is closed")
+        # Register the pgvector adapters on every pooled connection
+        _POOL = ConnectionPool(CONN_STR, min_size=2, max_size=10, open=True, configure=register_vector)
+    return _POOL
+
+
+def close_pool():
+    """Close the shared connection pool"""
+    global _POOL, _POOL_CLOSED
+    _POOL_CLOSED = True
+    if _POOL is not None:
+        _POOL.close()
+        _POOL = None
+
 
 def init_database():
     global CONN_STR
     if CONN_STR is None:
         CONN_STR = os.getenv("DATABASE_URL", "postgresql://maolin@localhost:5432/web_testing")
     
-    with psycopg.connect(CONN_STR) as conn:
+    # The extension must exist before pooled connections can register the vector types
+    with psycopg.connect(CONN_STR, autocommit=True) as conn:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        # Embeddings are stored as halfvec, which pgvector only provides from 0.7 on
+        version = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()[0]
+        if tuple(int(part) for part in version.split(".")[:2]) < (0, 7):
+            raise RuntimeError(f"pgvector {version} is installed, but halfvec embeddings require pgvector >= 0.7")
+
+    with _get_pool().connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
             _create_tables(cur)
+            _migrate_embedding_to_halfvec(cur)
             _create_indexes(cur)
             conn.commit()
 
@@ -59,7 +250,7 @@ def _create_tables(cursor):
             run_id TEXT NOT NULL,
             type TEXT NOT NULL,
             text TEXT NOT NULL,
-            embedding VECTOR(512),
+            embedding HALFVEC(512),
             summary TEXT,
             timestamp TIMESTAMP DEFAULT NOW(),
             url TEXT,
@@ -70,20 +261,55 @@ def _create_tables(cursor):
         );
     """)
 
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            hash TEXT PRIMARY KEY,
+            embedding HALFVEC(512) NOT NULL
+        );
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tool_outputs (
+            thread_id TEXT NOT NULL,
+            tool_call_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (thread_id, tool_call_id)
+        );
+    """)
+
+
+def _migrate_embedding_to_halfvec(cursor):
+    """Convert a float32 VECTOR embedding column from older schemas to HALFVEC"""
+    cursor.execute("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = 'artifacts'::regclass AND attname = 'embedding'
+    """)
+    row = cursor.fetchone()
+    if row and row[0].startswith("vector"):
+        print("🔄 Migrating artifacts.embedding to halfvec(512)")
+        # The old index uses vector opclasses, so it is rebuilt by _create_indexes afterwards
+        cursor.execute("DROP INDEX IF EXISTS idx_artifacts_embedding;")
+        cursor.execute("ALTER TABLE artifacts ALTER COLUMN embedding TYPE halfvec(512) USING embedding::halfvec(512);")
+
 
 def _create_indexes(cursor):
     indexes = [
         "CREATE INDEX IF NOT EXISTS idx_runs_start_ts ON runs(start_ts);",
-        "CREATE INDEX IF NOT EXISTS idx_artifacts_run_id ON artifacts(run_id);",
+        # Covers run/type filtering with the small projected columns; text and summary stay in the heap
+        "CREATE INDEX IF NOT EXISTS idx_artifacts_runtype ON artifacts(run_id, type) INCLUDE (timestamp, url);",
         "CREATE INDEX IF NOT EXISTS idx_artifacts_type ON artifacts(type);"
     ]
     for sql in indexes:
         cursor.execute(sql)
-    
-    try:
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_embedding ON artifacts USING hnsw (embedding vector_cosine_ops);")
-    except:
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_embedding ON artifacts USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);")
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_artifacts_embedding ON artifacts USING hnsw (embedding halfvec_cosine_ops) "
+        "WITH (m = 24, ef_construction = 128);"
+    )
+
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
 
 def _generate_artifact_summary(user_request: str, tool_name: str, text: str) -> str:
     """Generate summary for artifact storage"""
@@ -96,89 +322,200 @@ def _generate_artifact_summary(user_request: str, tool_name: str, text: str) ->
         return ""
 
 
+def _update_artifact_summary(artifact_id: str, user_request: str, tool_name: str, text: str):
+    """Generate an artifact's summary and write it onto the already stored row"""
+    summary = _generate_artifact_summary(user_request, tool_name, text)
+    if not summary:
+        return
+    try:
+        with _get_pool().connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE artifacts SET summary = %s WHERE id = %s", (summary, artifact_id))
+                conn.commit()
+    except Exception as e:
+        print(f"❌ Failed to update artifact summary: {repr(e)}")
+
+
 def save_artifact(run_id: str, art_type: str, text: str, url: str = "", user_request: str = "", tool_name: str = "") -> tuple:
+    """Embed and store an artifact, returning (saved, summary)"""
     try:
-        summary = ""
+        content_hash = _content_hash(text)
+        artifact_id = _artifact_id(run_id, art_type, content_hash)
+
+        # The summary LLM call and the embedding request are independent, so overlap them
+        summary_future = None
         if user_request and tool_name:
-            summary = _generate_artifact_summary(user_request, tool_name, text)
+            summary_future = _SUMMARY_EXECUTOR.submit(_generate_artifact_summary, user_request, tool_name, text)
 
-        embedding_vector = get_embeddings().embed_query(text)
-        artifact_id = save_artifact_to_db(run_id, art_type, text, embedding_vector, summary, url)
+        embedding_vector = embed_texts_cached([text], [content_hash])[0]
+        summary = summary_future.result() if summary_future else ""
+        artifact_id = save_artifact_to_db(run_id, art_type, text, embedding_vector, summary, url, artifact_id)
         return bool(artifact_id), summary
     except Exception as e:
         print(f"❌ Failed to save artifact: {repr(e)}")
         return False, ""
 
-def search_artifacts_advanced(query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[dict]:
+
+def save_artifacts_bulk(run_id: str, items: List[Dict[str, str]], background_summary: bool = False) -> List[str]:
+    """Save several artifacts with one embeddings request and one database round trip
+
+    Each item needs "type" and "text", and may carry "url", "user_request" and "tool_name".
+    With background_summary the rows are written with empty summaries, which worker threads fill in
+    afterwards, so the caller only waits for embedding + insert.
+    Returns the saved artifact ids (empty list on failure).
+    """
+    if not items:
+        return []
+    try:
+        wants_summary = [bool(item.get("user_request") and item.get("tool_name")) for item in items]
+        summary_futures = [
+            _SUMMARY_EXECUTOR.submit(_generate_artifact_summary, item["user_request"], item["tool_name"], item["text"])
+            if wanted and not background_summary else None
+            for item, wanted in zip(items, wants_summary)
+        ]
+        hashes = [_content_hash(item["text"]) for item in items]
+        vectors = embed_texts_cached([item["text"] for item in items], hashes)
+        rows = [
+            (_artifact_id(run_id, item["type"], content_hash), run_id, item["type"], item["text"],
+             _to_halfvec(vector), future.result() if future else "", item.get("url", ""))
+            for item, content_hash, vector, future in zip(items, hashes, vectors, summary_futures)
+        ]
+        saved = save_artifacts_to_db(rows)
+        if background_summary and saved:
+            for item, row, wanted in zip(items, rows, wants_summary):
+                if wanted:
+                    _SUMMARY_EXECUTOR.submit(_update_artifact_summary, row[0], item["user_request"], item["tool_name"], item["text"])
+        return saved
+    except Exception as e:
+        print(f"❌ Failed to save artifacts: {repr(e)}")
+        return []
+
+def _set_ef_search(cursor, k: int):
+    """Set the HNSW search breadth for the current transaction, widening it for larger k"""
+    ef_search = max(AGENT_CONFIG["hnsw_ef_search"], 10 * k)
+    cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),), prepare=True)
+
+
+# Columns search_artifacts_advanced accepts as equality filters
+_SEARCH_FILTER_COLUMNS = ("run_id", "type", "url")
+
+
+def _search_sql(type_op: str, vec: str = "vec", filters: Optional[Dict[str, Any]] = None) -> str:
+    """Nearest-neighbor query over tool records (IN) or content artifacts (NOT IN)
+
+    The query vector is a named parameter, so it is bound and parsed once however often it appears.
+    Filters become %(f_<column>)s equality predicates, so the planner can pre-filter before HNSW ordering.
+    """
+    filter_sql = "".join(f"\n          AND {column} = %(f_{column})s" for column in (filters or ()))
+    return f"""
+        SELECT id, run_id, type, text, summary, timestamp, url,
+               embedding <=> %({vec})s AS distance
+        FROM artifacts
+        WHERE type {type_op} ('tool_call', 'tool_result')
+          AND (%(max_distance)s::float IS NULL OR embedding <=> %({vec})s <= %(max_distance)s::float){filter_sql}
+        ORDER BY embedding <=> %({vec})s
+        LIMIT %(k)s
+    """
+
+
+def search_artifacts_advanced(query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+                              distance_threshold: Optional[float] = None) -> List[ArtifactHit]:
     try:
-        query_vector = get_embeddings().embed_query(query)
+        query_vector = embed_query_cached(query)
+        filters = {column: value for column, value in (filters or {}).items() if column in _SEARCH_FILTER_COLUMNS}
+        params = {"vec": _to_halfvec(query_vector), "max_distance": distance_threshold, "k": k}
+        params.update((f"f_{column}", value) for column, value in filters.items())
         
-        with psycopg.connect(CONN_STR) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-SELECT id, run_id, type, text, summary, timestamp, url,
-                           embedding <=> %s::vector as distance
-                    FROM artifacts
-                    WHERE type NOT IN ('tool_call', 'tool_result')  -- Exclude tool execution records
-                    ORDER BY embedding <=> %s::vector
-                    LIMIT %s
-                """, (query_vector, query_vector, k))
-
-                results = []
-                for row in cur.fetchall():
-                    results.append({
-                        "content": row[3],
-                        "metadata": {
-                            "doc_id": row[0], "run_id": row[1], "type": row[2],
-                            "summary": row[4], "timestamp": row[5], "url": row[6],
-                            "distance": float(row[7])
-                        },
-                        "summary": row[4] or row[3][:200],
-                        "doc_id": row[0],
-                        "timestamp": str(row[5]) if row[5] else ""
-                    })
-                return results
+        with _get_pool().connection() as conn:
+            with conn.cursor(row_factory=_hit_row) as cur:
+                # set_config and the search go out in one flush instead of two round trips
+                with conn.pipeline():
+                    _set_ef_search(cur, k)
+                    # Prepared on first use per pooled connection, so repeat searches skip parse/plan
+                    cur.execute(_search_sql("NOT IN", filters=filters), params, prepare=True)
+
+                return cur.fetchall()
     except Exception as e:
         print(f"❌ Search failed: {repr(e)}")
         return []
 
-def search_experience_advanced(query: str, k: int = 5) -> List[dict]:
+def search_artifacts_batch(queries: List[str], k: int = 8,
+                           distance_threshold: Optional[float] = None) -> List[ArtifactHit]:
+    """Search artifacts for several queries with one embeddings request and one SQL round trip
+
+    Hits are merged across queries (closest distance wins) and sorted by distance.
+    """
+    if not queries:
+        return []
+    try:
+        query_vectors = embed_queries_cached(queries)
+
+        sql = " UNION ALL ".join(f"({_search_sql('NOT IN', f'vec{i}')})" for i in range(len(query_vectors)))
+        params = {f"vec{i}": _to_halfvec(vector) for i, vector in enumerate(query_vectors)}
+        params.update(max_distance=distance_threshold, k=k)
+
+        with _get_pool().connection() as conn:
+            with conn.cursor(row_factory=_hit_row) as cur:
+                # set_config and the search go out in one flush instead of two round trips
+                with conn.pipeline():
+                    _set_ef_search(cur, k)
+                    cur.execute(sql, params)
+                merged = {}
+                for hit in cur:
+                    if hit.doc_id not in merged or hit.distance < merged[hit.doc_id].distance:
+                        merged[hit.doc_id] = hit
+                return sorted(merged.values(), key=lambda hit: hit.distance)
+    except Exception as e:
+        print(f"❌ Batch search failed: {repr(e)}")
+        return []
+
+
+# Case-insensitive single-pass scans, so classification never lowercases the whole content
+_TEST_CODE_RE = re.compile(r'scenario:|given|when|then|feature:|describe\(|it\(|cy\.', re.I)
+_REQ_HEADER_RE = re.compile(r'functional requirements', re.I)
+
+
+def classify_artifacts(hits: List[ArtifactHit]) -> Dict[str, List[ArtifactHit]]:
+    """Split artifact hits into requirements, test code and other content"""
+    classified = {"requirements": [], "test_code": [], "other": []}
+    for hit in hits:
+        content = hit.content
+        if (_REQ_HEADER_RE.search(content) or
+                (content.count('- ') >= 2 and content.count('\n') >= 3)):
+            classified["requirements"].append(hit)
+        elif _TEST_CODE_RE.search(content):
+            classified["test_code"].append(hit)
+        else:
+            classified["other"].append(hit)
+    return classified
+
+
+def search_experience_advanced(query: str, k: int = 5, distance_threshold: Optional[float] = None,
+                               query_vector: Optional[List[float]] = None) -> List[ArtifactHit]:
     """Search only tool execution records for experience lookup"""
     try:
-        query_vector = get_embeddings().embed_query(query)
+        if query_vector is None:
+            query_vector = embed_query_cached(query)
         
-        with psycopg.connect(CONN_STR) as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-SELECT id, run_id, type, text, summary, timestamp, url,
-                           embedding <=> %s::vector as distance
-                    FROM artifacts
-                    WHERE type IN ('tool_call', 'tool_result')  -- Only include tool execution records
-                    ORDER BY embedding <=> %s::vector
-                    LIMIT %s
-                """, (query_vector, query_vector, k))
-
-                results = []
-                for row in cur.fetchall():
-                    results.append({
-                        "content": row[3],
-                        "metadata": {
-                            "doc_id": row[0], "run_id": row[1], "type": row[2],
-                            "summary": row[4], "timestamp": row[5], "url": row[6],
-                            "distance": float(row[7])
-                        },
-                        "summary": row[4] or row[3][:200],
-                        "doc_id": row[0],
-                        "timestamp": str(row[5]) if row[5] else ""
-                    })
-                return results
+        with _get_pool().connection() as conn:
+            with conn.cursor(row_factory=_hit_row) as cur:
+                # set_config and the search go out in one flush instead of two round trips
+                with conn.pipeline():
+                    _set_ef_search(cur, k)
+                    cur.execute(
+                        _search_sql("IN"),
+                        {"vec": _to_halfvec(query_vector), "max_distance": distance_threshold, "k": k},
+                        prepare=True
+                    )
+
+                return cur.fetchall()
     except Exception as e:
         print(f"❌ Experience search failed: {repr(e)}")
         return []
 
 def get_content_by_id(doc_id: str) -> Optional[str]:
     try:
-        with psycopg.connect(CONN_STR) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("SELECT text FROM artifacts WHERE id = %s", (doc_id,))
                 result = cur.fetchone()
@@ -187,10 +524,21 @@ def get_content_by_id(doc_id: str) -> Optional[str]:
         print(f"❌ get_content_by_id error: {repr(e)}")
         return None
 
+# Client-side start times of open runs, so completion can record a duration in the same UPDATE.
+# Bounded: runs that die before a status update would otherwise stay here forever
+_RUN_STARTS: Dict[str, float] = {}
+_RUN_STARTS_MAX = 1024
+_RUN_STARTS_LOCK = threading.Lock()  # create_run / update_run_status run in worker threads
+
+
 def create_run(url: str, description: str = "", user_id: str = None, model: str = "gpt-4o") -> str:
     run_id = f"run_{uuid.uuid4().hex}"
+    with _RUN_STARTS_LOCK:
+        _RUN_STARTS[run_id] = time.monotonic()
+        while len(_RUN_STARTS) > _RUN_STARTS_MAX:
+            del _RUN_STARTS[next(iter(_RUN_STARTS))]  # Oldest first (dicts keep insertion order)
     try:
-        with psycopg.connect(CONN_STR) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO runs (run_id, url, description, user_id, model, status)
@@ -203,67 +551,160 @@ def create_run(url: str, description: str = "", user_id: str = None, model: str
         return run_id
 
 def update_run_status(run_id: str, status: str, duration: int = None) -> bool:
+    with _RUN_STARTS_LOCK:
+        started = _RUN_STARTS.pop(run_id, None)
+    if duration is None and started is not None:
+        duration = int(time.monotonic() - started)
     try:
-        with psycopg.connect(CONN_STR) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
-                if duration:
-                    cur.execute("UPDATE runs SET status = %s, duration = %s WHERE run_id = %s", (status, duration, run_id))
-                else:
-                    cur.execute("UPDATE runs SET status = %s WHERE run_id = %s", (status, run_id))
+                cur.execute(
+                    "UPDATE runs SET status = %s, duration = COALESCE(%s, duration), updated_at = NOW() WHERE run_id = %s",
+                    (status, duration, run_id), prepare=True
+                )
                 conn.commit()
         return True
     except Exception as e:
         print(f"❌ update_run_status error: {repr(e)}")
         return False
 
-def save_artifact_to_db(run_id: str, art_type: str, text: str, embedding: List[float], summary: str = "", url: str = "") -> str:
-    content_hash = hashlib.md5(text.encode()).hexdigest()[:8]
-    artifact_id = f"{run_id}_{art_type}_{content_hash}"
+_ARTIFACT_UPSERT_SQL = """
+    INSERT INTO artifacts (id, run_id, type, text, embedding, summary, url)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (id) DO UPDATE
+      SET text = EXCLUDED.text,
+          embedding = EXCLUDED.embedding,
+          summary = EXCLUDED.summary,
+          url = EXCLUDED.url
+"""
+
+
+def _artifact_id(run_id: str, art_type: str, content_hash: str) -> str:
+    return f"{run_id}_{art_type}_{content_hash[:8]}"
+
+
+# Batches larger than this are loaded with COPY through a staging table instead of executemany
+_COPY_THRESHOLD = 100
+
+
+def _copy_artifacts(cur, rows: List[tuple]):
+    """Bulk-load rows with COPY into a temp table, then upsert them into artifacts"""
+    cur.execute("CREATE TEMP TABLE artifacts_staging (LIKE artifacts INCLUDING DEFAULTS) ON COMMIT DROP")
+    # Binary format ships each HalfVector as packed FP16 rather than a decimal text literal
+    with cur.copy("COPY artifacts_staging (id, run_id, type, text, embedding, summary, url) FROM STDIN WITH (FORMAT BINARY)") as copy:
+        copy.set_types(["text", "text", "text", "text", "halfvec", "text", "text"])
+        for row in rows:
+            copy.write_row(row)
+    # DISTINCT ON keeps the upsert valid when the batch repeats an id
+    cur.execute("""
+        INSERT INTO artifacts (id, run_id, type, text, embedding, summary, url)
+        SELECT DISTINCT ON (id) id, run_id, type, text, embedding, summary, url FROM artifacts_staging
+        ON CONFLICT (id) DO UPDATE
+          SET text = EXCLUDED.text,
+              embedding = EXCLUDED.embedding,
+              summary = EXCLUDED.summary,
+              url = EXCLUDED.url
+    """)
+
+
+def save_artifacts_to_db(rows: List[tuple]) -> List[str]:
+    """Upsert (id, run_id, type, text, HalfVector embedding, summary, url) rows in one batch"""
+    if not rows:
+        return []
     try:
-        with psycopg.connect(CONN_STR) as conn:
+        with _get_pool().connection() as conn:
             with conn.cursor() as cur:
+                if len(rows) > _COPY_THRESHOLD:
+                    _copy_artifacts(cur, rows)
+                elif len(rows) == 1:
+                    # The per-step save path: a prepared upsert with binary parameters
+                    cur.execute(_ARTIFACT_UPSERT_SQL, rows[0], prepare=True)
+                else:
+                    # Pipelined so the statements go out without waiting on each reply
+                    with conn.pipeline():
+                        cur.executemany(_ARTIFACT_UPSERT_SQL, rows)
+                conn.commit()
+        return [row[0] for row in rows]
+    except Exception as e:
+        print(f"❌ save_artifacts_to_db error: {repr(e)}")
+        return []
+
+
+def save_artifact_to_db(run_id: str, art_type: str, text: str, embedding: List[float], summary: str = "", url: str = "",
+                        artifact_id: Optional[str] = None) -> str:
+    artifact_id = artifact_id or _artifact_id(run_id, art_type, _content_hash(text))
+    row = (artifact_id, run_id, art_type, text, _to_halfvec(embedding), summary, url)
+    saved = save_artifacts_to_db([row])
+    return saved[0] if saved else ""
+
+def get_recent_runs(limit: int = 10) -> List[Dict[str, Any]]:
+    try:
+        with _get_pool().connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                # Only the columns the run listing shows; the sort and LIMIT are served by idx_runs_start_ts
                 cur.execute(
-                    """
-                    INSERT INTO artifacts (id, run_id, type, text, embedding, summary, url)
-                    VALUES (%s, %s, %s, %s, %s::vector, %s, %s)
-                    ON CONFLICT (id) DO UPDATE
-                      SET text = EXCLUDED.text,
-                          embedding = EXCLUDED.embedding,
-                          summary = EXCLUDED.summary,
-                          url = EXCLUDED.url
-                    """,
-                    (artifact_id, run_id, art_type, text, _to_vector_literal(embedding), summary, url)
+                    "SELECT run_id, url, start_ts, status FROM runs ORDER BY start_ts DESC LIMIT %s", (limit,), prepare=True
                 )
-                conn.commit()
-        return artifact_id
+                return cur.fetchall()
     except Exception as e:
-        print(f"❌ save_artifact_to_db error: {repr(e)}")
-        return ""
+        print(f"❌ get_recent_runs error: {repr(e)}")
+        return []
+
+def save_tool_output(thread_id: str, tool_call_id: str, content: str) -> bool:
+    """Store the full text of a tool result whose message is truncated in agent state"""
+    try:
+        with _get_pool().connection() as conn:
+            conn.execute(
+                "INSERT INTO tool_outputs (thread_id, tool_call_id, content) VALUES (%s, %s, %s) "
+                "ON CONFLICT (thread_id, tool_call_id) DO NOTHING",
+                (thread_id, tool_call_id, content), prepare=True
+            )
+        return True
+    except Exception as e:
+        print(f"❌ save_tool_output error: {repr(e)}")
+        return False
+
+
+def get_tool_output(thread_id: str, tool_call_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[tuple]:
+    """Get a slice of a stored tool result as (text, total_length), or None if nothing is stored"""
+    try:
+        with _get_pool().connection() as conn:
+            # substr is 1-based and character-counted, so only the requested page leaves the server
+            row = conn.execute(
+                "SELECT substr(content, %s, %s), length(content) FROM tool_outputs "
+                "WHERE thread_id = %s AND tool_call_id = %s",
+                (offset + 1, limit if limit is not None else 2**31 - 1, thread_id, tool_call_id), prepare=True
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+    except Exception as e:
+        print(f"❌ get_tool_output error: {repr(e)}")
+        return None
+
 
 class DatabaseCompat:
     async def connect(self):
         init_database()
         
     async def close(self):
-        pass
+        # Background summary updates still need the pool, so let them finish before closing it
+        await asyncio.to_thread(_SUMMARY_EXECUTOR.shutdown, wait=True)
+        close_pool()
         
+    # The sync helpers run in worker threads so pool waits and queries don't block the event loop
     async def create_run(self, url: str, description: str = "", user_id: str = None, model: str = "gpt-4o") -> str:
-        return create_run(url, description, user_id, model)
+        return await asyncio.to_thread(create_run, url, description, user_id, model)
         
     async def update_run_status(self, run_id: str, status: str, duration: int = None) -> bool:
-        return update_run_status(run_id, status, duration)
+        return await asyncio.to_thread(update_run_status, run_id, status, duration)
         
     async def save_artifact(self, run_id: str, artifact_type: str, content: str, url: str = "", user_request: str = "", tool_name: str = "") -> tuple:
-        return save_artifact(run_id, artifact_type, content, url, user_request, tool_name)
+        # Summary and embedding are network calls; keep them off the event loop
+        return await asyncio.to_thread(save_artifact, run_id, artifact_type, content, url, user_request, tool_name)
+
+    async def save_artifacts_bulk(self, run_id: str, items: List[Dict[str, str]], background_summary: bool = False) -> List[str]:
+        return await asyncio.to_thread(save_artifacts_bulk, run_id, items, background_summary)
         
     async def get_recent_runs(self, limit: int = 10):
-        try:
-            with psycopg.connect(CONN_STR) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT run_id, url, start_ts, status, duration, description FROM runs ORDER BY start_ts DESC LIMIT %s", (limit,))
-                    return [{"run_id": row[0], "url": row[1], "start_ts": row[2], "status": row[3], "duration": row[4], "description": row[5]} for row in cur.fetchall()]
-        except Exception as e:
-            print(f"❌ get_recent_runs error: {repr(e)}")
-            return []
+        return await asyncio.to_thread(get_recent_runs, limit)
 
 db = DatabaseCompat()
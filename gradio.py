@@ -6,28 +6,56 @@ Intelligent agent with database storage and multi-turn conversation memory
 import os
 import sys
 import re
+import reprlib
+import time
 import uuid
 import asyncio
+import contextlib
 from typing import Optional, List, Dict, Any, Tuple
 
+# Read by Gradio at import time; also covers the launch and version-check pings that Blocks(analytics_enabled=False) does not
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
 import gradio as gr
 import psycopg
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from agent import get_agent
-from database import init_database, db
+from agent import get_agent, init_checkpointer, step_messages
+from database import db
 from config import setup_environment
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Constants
-AGENT = get_agent()
-URL_PATTERN = r'https?://[^\s]+'
+URL_RE = re.compile(r'https?://\S+', re.ASCII)
 DEFAULT_URL = "unknown"
 MAX_DESCRIPTION_LENGTH = 100
+STREAM_FLUSH_INTERVAL = 0.075  # Seconds between UI updates while the agent streams steps
+HISTORY_DETAIL_TURNS = 5  # Turns whose tool results stay in full; older ones are collapsed to a marker
+# A result block runs until the next reasoning step, not the first fence: results may contain fenced code
+RESULT_BLOCK_RE = re.compile(
+    r"✅ \*\*Result\*\*:\n```\n.*?\n```(?=\n\n(?:---\n\n|✅ \*\*Result\*\*|🔔 \*\*)|$)", re.DOTALL
+)
+
+# Bounded repr for tool-call previews: stops after ~200 chars instead of stringifying the full args
+_ARGS_REPR = reprlib.Repr()
+_ARGS_REPR.maxstring = 200
+_ARGS_REPR.maxdict = 4
+_ARGS_REPR.maxlist = 4
+
+# Serializes the first requests so only one checkpointer pool is opened
+_CHECKPOINTER_LOCK = asyncio.Lock()
 
 
 def extract_url(query: str) -> str:
     """Extract URL from query string."""
-    match = re.search(URL_PATTERN, query)
+    start = query.find('http')  # Cheap substring scan skips the regex for follow-up questions
+    if start < 0:
+        return DEFAULT_URL
+    match = URL_RE.search(query, start)
     return match.group(0) if match else DEFAULT_URL
 
 
@@ -48,21 +76,32 @@ def truncate_content(content: str, max_length: int = 500) -> str:
     return content[:max_length] + "\n\n... (result truncated)" if len(content) > max_length else content
 
 
+class ReasoningSteps(list):
+    """Reasoning step list that keeps its rendered text up to date as steps are appended."""
+    
+    def __init__(self):
+        super().__init__()
+        self.text = ""
+    
+    def append(self, step: str):
+        super().append(step)
+        # Extend the rendered text by the new step instead of re-joining every step on each update
+        self.text = f"{self.text}\n\n{step}" if self.text else step
+
+
 def add_summary_notification(reasoning_steps: List[str], summary: str):
     """Add formatted summary notification."""
     if not summary:
         return
         
-    lines = summary.split('\n')
-    request = action = result = ""
-    
-    for line in lines:
-        if line.startswith('REQUEST: '):
-            request = line.replace('REQUEST: ', '')
-        elif line.startswith('ACTION: '):
-            action = line.replace('ACTION: ', '')
-        elif line.startswith('RESULT: '):
-            result = line.replace('RESULT: ', '')
+    fields = {}
+    for line in summary.split('\n'):
+        key, sep, value = line.partition(': ')
+        if sep:
+            fields[key] = value
+    request = fields.get('REQUEST', "")
+    action = fields.get('ACTION', "")
+    result = fields.get('RESULT', "")
     
     notification = "🔔 **Tool Call Summary Recorded**"
     if request:
@@ -83,103 +122,177 @@ async def record_artifact(run_id: str, artifact_type: str, content: str,
     return False, ""
 
 
-def clear_history() -> Tuple[List, List, str]:
-    """Clear chat history and reset thread_id."""
-    return [], [], str(uuid.uuid4())
+def add_recorded_summaries(pending: List[asyncio.Task], reasoning_steps: List[str]):
+    """Add summary notifications for artifact saves that have finished, keeping the rest pending."""
+    for task in [task for task in pending if task.done()]:
+        pending.remove(task)
+        success, summary = task.result()
+        if success:
+            add_summary_notification(reasoning_steps, summary)
+
+
+async def iter_with_flush_ticks(stream, get_deadline):
+    """Iterate an async stream, yielding None whenever get_deadline() passes before the next item arrives.
+
+    get_deadline returns a time.monotonic() deadline, or None while nothing is waiting to be flushed.
+    """
+    iterator = stream.__aiter__()
+    next_item = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            deadline = get_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = await asyncio.wait((next_item,), timeout=timeout)
+            if not done:
+                yield None
+                continue
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            next_item = asyncio.ensure_future(iterator.__anext__())
+            yield item
+    finally:
+        if not next_item.done():
+            next_item.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await next_item
+
+
+async def ensure_checkpointer():
+    """Open the persistent checkpointer on the first request.
+
+    Its async pool is bound to the loop it is opened on, so it must be created on the server's
+    event loop that runs the handlers, not on bootstrap()'s loop, which blocks inside launch().
+    """
+    async with _CHECKPOINTER_LOCK:
+        await init_checkpointer()
 
 
-def update_history(history: List[Dict], reasoning_steps: List[str]) -> List[Dict]:
-    """Update history with current reasoning steps."""
-    if history:
-        history[-1]["content"] = "\n\n".join(reasoning_steps)
-    return history
+def clear_history() -> Tuple[List, Optional[str]]:
+    """Clear chat history and reset thread_id (a new one is assigned on the next query)."""
+    return [], None
+
+
+def archive_old_results(history: List[Dict]):
+    """Collapse tool result blocks of the turn that just left the detailed window.
+
+    Called once per turn after the new user message is appended, so each turn is archived exactly once
+    and the history shipped on every yield stays bounded by the recent turns.
+    """
+    turns = 0
+    for message in reversed(history):
+        if message["role"] == "user":
+            turns += 1
+            if turns > HISTORY_DETAIL_TURNS:
+                return
+        elif turns == HISTORY_DETAIL_TURNS and isinstance(message["content"], str):
+            message["content"] = RESULT_BLOCK_RE.sub("✅ **Result**: _(archived)_", message["content"])
 
 
 async def respond_stream(query: str, history: List[Dict], thread_id: str):
     """Main conversation handler with streaming support."""
     if not query.strip():
-        yield history, history, thread_id
+        yield history, thread_id
         return
     
     # Initialize
     url = extract_url(query)
     run_id = await db.create_run(url, description=query[:MAX_DESCRIPTION_LENGTH])
-    thread_id = thread_id or str(uuid.uuid4())
-    history = (history or []).copy()
+    thread_id = thread_id or uuid.uuid4().hex
+    # The chatbot value is the conversation itself (no separate state copy), so append to it in place
+    history = history if history is not None else []
     
     # Add user message and thinking indicator
     history.append({"role": "user", "content": query})
-    history.append({"role": "assistant", "content": "🤔 Thinking..."})
-    yield history, history, thread_id
+    archive_old_results(history)
+    # The reply dict is kept and mutated directly for the rest of the turn
+    reply = {"role": "assistant", "content": "🤔 Thinking..."}
+    history.append(reply)
+    yield history, thread_id
     
     try:
+        await ensure_checkpointer()
         config = {"configurable": {"thread_id": thread_id}}
-        reasoning_steps = []
+        reasoning_steps = ReasoningSteps()
+        # Artifact saves run in the background so the stream never waits on the database
+        pending: List[asyncio.Task] = []
+        last_yield = time.monotonic()
+        flushed = 0  # Number of reasoning steps already shown
+        
+        def flush_deadline() -> Optional[float]:
+            return last_yield + STREAM_FLUSH_INTERVAL if len(reasoning_steps) > flushed else None
         
-        async for step in AGENT.astream(
+        # get_agent() caches the compiled graph, so it is built on the first query rather than at import.
+        # A None step is a trailing flush: steps held back by the debounce are shown once the interval
+        # passes, instead of waiting behind the next (possibly multi-second) model call
+        updates = get_agent().astream(
             {"messages": [{"role": "user", "content": query}], "run_id": run_id},
-            config, stream_mode="values"
-        ):
-            if not (step.get("messages") and step["messages"]):
-                continue
+            config, stream_mode="updates"
+        )
+        async for step in iter_with_flush_ticks(updates, flush_deadline):
+            # Each update carries only the messages its node added, not the whole conversation
+            for message in step_messages(step) if step is not None else ():
+                # Dispatch on the LangChain message type; only AI messages carry tool_calls
+                kind = message.type
                 
-            last_message = step["messages"][-1]
-            
-            # Skip user messages
-            if getattr(last_message, 'type', None) == 'human':
-                continue
-            
-            # Handle tool calls
-            if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-                for tool_call in last_message.tool_calls:
-                    tool_info = format_tool_info(tool_call["name"], tool_call.get("args", {}))
-                    reasoning_steps.append(f"---\n\n🔧 **Executing**: {tool_info}")
-                    
-                    # Record tool call
-                    args_preview = str(tool_call.get("args", {}))[:200]
-                    call_info = f"Tool: {tool_call['name']}, Args: {args_preview}"
-                    success, summary = await record_artifact(run_id, "tool_call", call_info, query, url, tool_call["name"])
-                    
-                    if success:
-                        add_summary_notification(reasoning_steps, summary)
-                    
-                    yield update_history(history, reasoning_steps), history, thread_id
-            
-            # Handle tool results
-            elif hasattr(last_message, 'tool_call_id'):
-                result_content = truncate_content(getattr(last_message, 'content', str(last_message)))
-                reasoning_steps.append(f"✅ **Result**:\n```\n{result_content}\n```")
+                # Handle tool calls
+                if kind == 'ai' and message.tool_calls:
+                    for tool_call in message.tool_calls:
+                        tool_info = format_tool_info(tool_call["name"], tool_call.get("args", {}))
+                        reasoning_steps.append(f"---\n\n🔧 **Executing**: {tool_info}")
+                        
+                        # Record tool call
+                        args_preview = _ARGS_REPR.repr(tool_call.get("args", {}))
+                        call_info = f"Tool: {tool_call['name']}, Args: {args_preview}"
+                        pending.append(asyncio.create_task(
+                            record_artifact(run_id, "tool_call", call_info, query, url, tool_call["name"])
+                        ))
                 
-                success, summary = await record_artifact(run_id, "tool_result", result_content, query, url)
-                if success:
-                    add_summary_notification(reasoning_steps, summary)
+                # Handle tool results
+                elif kind == 'tool':
+                    result_content = truncate_content(message.content)
+                    reasoning_steps.append(f"✅ **Result**:\n```\n{result_content}\n```")
+                    
+                    pending.append(asyncio.create_task(record_artifact(run_id, "tool_result", result_content, query, url)))
                 
-                yield update_history(history, reasoning_steps), history, thread_id
+                # Handle AI analysis
+                elif kind == 'ai':
+                    content = message.content
+                    if content and content != query:
+                        reasoning_steps.append(f"---\n\n🤖 **Analysis**:\n{content}")
             
-            # Handle AI analysis
-            else:
-                content = getattr(last_message, 'content', '')
-                if content and content != query:
-                    reasoning_steps.append(f"---\n\n🤖 **Analysis**:\n{content}")
-                    yield update_history(history, reasoning_steps), history, thread_id
+            # Every yield ships the whole history to the browser, so coalesce rapid steps;
+            # the final yield below always delivers whatever is left. The thread id was set by the
+            # first yield, so only the chatbot is updated here
+            add_recorded_summaries(pending, reasoning_steps)
+            if len(reasoning_steps) > flushed and time.monotonic() - last_yield >= STREAM_FLUSH_INTERVAL:
+                last_yield = time.monotonic()
+                flushed = len(reasoning_steps)
+                reply["content"] = reasoning_steps.text
+                yield history, gr.skip()
         
         # Finalize response
+        if pending:
+            await asyncio.wait(pending)
+            add_recorded_summaries(pending, reasoning_steps)
         if not reasoning_steps:
-            history[-1]["content"] = "❌ No response received, please retry"
-            if run_id:
-                await db.update_run_status(run_id, "error")
+            reply["content"] = "❌ No response received, please retry"
+            status = "error"
         else:
-            history[-1]["content"] = "\n\n".join(reasoning_steps) + "\n\n---\n\n✨ **Complete**"
-            if run_id:
-                await db.update_run_status(run_id, "completed")
+            reply["content"] = reasoning_steps.text + "\n\n---\n\n✨ **Complete**"
+            status = "completed"
         
-        yield history, history, thread_id
+        # Show the final answer before the run status round trip
+        yield history, thread_id
+        if run_id:
+            await db.update_run_status(run_id, status)
         
     except Exception as e:
-        history[-1]["content"] = f"❌ Error: {str(e)}"
+        reply["content"] = f"❌ Error: {str(e)}"
         if run_id:
             await db.update_run_status(run_id, "error")
-        yield history, history, thread_id
+        yield history, thread_id
 
 
 def create_ui():
@@ -198,8 +311,8 @@ def create_ui():
         gr.Markdown("🤖 Intelligent agent with database storage and multi-turn conversation memory, supporting real-time streaming responses")
         
         # State management
-        history_state = gr.State([])
-        thread_id_state = gr.State(str(uuid.uuid4()))
+        # Assigned on the first query; a default id here would be copied into every session
+        thread_id_state = gr.State(None)
         
         # Main components
         chatbot = gr.Chatbot(
@@ -223,8 +336,8 @@ def create_ui():
             gr.Markdown("💡 **Tip:** Supports real-time streaming responses - you can see the agent's thinking process")
         
         # Event handlers
-        stream_inputs = [user_input, history_state, thread_id_state]
-        stream_outputs = [chatbot, history_state, thread_id_state]
+        stream_inputs = [user_input, chatbot, thread_id_state]
+        stream_outputs = [chatbot, thread_id_state]
         
         # Submit and enter key handlers
         for trigger in [submit_btn.click, user_input.submit]:
@@ -239,7 +352,7 @@ def create_ui():
         clear_btn.click(
             fn=clear_history,
             inputs=[],
-            outputs=[history_state, chatbot, thread_id_state]
+            outputs=[chatbot, thread_id_state]
         )
     
     return demo
@@ -249,8 +362,9 @@ async def wait_for_db(conn_str: str, tries: int = 20, delay: float = 0.5) -> boo
     """Wait for database to be ready."""
     for i in range(tries):
         try:
-            with psycopg.connect(conn_str) as _:
-                return True
+            conn = await psycopg.AsyncConnection.connect(conn_str, connect_timeout=1)
+            await conn.close()
+            return True
         except Exception as e:
             print(f"DB not ready ({i+1}/{tries}): {e}")
             await asyncio.sleep(delay)
@@ -265,19 +379,20 @@ async def bootstrap():
     if not await wait_for_db(conn_str):
         raise RuntimeError("Database connection failed")
     
-    init_database()
     await db.connect()
     
     port = int(os.environ.get("GRADIO_SERVER_PORT", 7861))
     demo = create_ui()
     
-    demo.queue().launch(
+    # Bounded queue: up to 8 concurrent agent runs, further requests rejected once 64 are waiting
+    demo.queue(default_concurrency_limit=8, max_size=64, api_open=False).launch(
         server_name="0.0.0.0",
         server_port=port,
-        share=False,
-        show_api=True,
+        share=os.environ.get("GRADIO_SHARE", "0") == "1",  # Public tunnel only when explicitly opted in
+        show_api=False,
         show_error=True,
-        prevent_thread_lock=False
+        prevent_thread_lock=False,
+        max_threads=40
     )
 
 
@@ -286,4 +401,6 @@ if __name__ == "__main__":
     print("🌐 Open your browser to http://localhost:7861")
     print("💡 To use the CLI version, run: python cli.py")
     
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     asyncio.run(bootstrap())
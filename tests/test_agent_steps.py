@@ -0,0 +1,27 @@
+"""
+Stream step processing test - a large tool result must be recorded exactly once
+"""
+
+from langchain_core.messages import ToolMessage
+from agent.state import TOOL_OUTPUT_LIMIT, TOOL_OUTPUT_PREVIEW
+from cli import ArtifactBuffer, _process_agent_step
+
+
+def test_large_tool_result_single_artifact():
+    """The pre_model_hook's truncated copy must not produce a second artifact"""
+    content = "x" * (TOOL_OUTPUT_LIMIT * 2)
+    result = ToolMessage(content=content, tool_call_id="call_1", name="scrape_url", id="msg_1")
+    truncated = result.model_copy(update={"content": f"{content[:TOOL_OUTPUT_PREVIEW]}\n...[truncated, id=call_1]"})
+
+    artifacts = ArtifactBuffer("test_run_001")
+    _process_agent_step({"tools": {"messages": [result]}}, artifacts, "scrape", "https://test.example.com")
+    _process_agent_step({"pre_model_hook": {"messages": [truncated]}}, artifacts, "scrape", "https://test.example.com")
+
+    assert len(artifacts.items) == 1, f"expected 1 artifact, got {len(artifacts.items)}"
+    assert artifacts.items[0]["text"] == content
+    print("✅ Large tool result recorded once with its full text")
+
+
+if __name__ == "__main__":
+    test_large_tool_result_single_artifact()
+    print("🎉 Test completed")
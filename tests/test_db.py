@@ -28,7 +28,7 @@ async def quick_test():
 
     # Display search results
     for i, result in enumerate(results[:2]):  # Only show first 2 results
-        print(f"  Result {i+1}: {result.get('summary', 'No summary')[:50]}...")
+        print(f"  Result {i+1}: {(result.summary or 'No summary')[:50]}...")
 
     await db.close()
     return True